@@ -6,15 +6,107 @@ TODO: Consider incorporating other columns identified in The Data Warehouse ETL
 import sys
 import argparse
 import datetime
+import gzip
+import concurrent.futures
+import os
 import calendar
-import math
-import csv
+import itertools
 import numpy
 import holidays
 
 # Set Calendar's first day of the week to Sunday
 calendar.setfirstweekday(6)
 
+# English names indexed by datetime.date.weekday() (Monday is 0) and by month number
+_DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+_DAY_ABBR = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTH_NAMES = ('', 'January', 'February', 'March', 'April', 'May', 'June', 'July',
+                'August', 'September', 'October', 'November', 'December')
+_MONTH_ABBR = ('', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+_QUARTER_NAMES = ('', 'First', 'Second', 'Third', 'Fourth')
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Season indexed by day of the year, 1..366
+_SEASON_BY_DOY = numpy.empty(367, dtype='U6')
+_SEASON_BY_DOY[:80] = 'Winter'
+_SEASON_BY_DOY[80:172] = 'Spring'
+_SEASON_BY_DOY[172:264] = 'Summer'
+_SEASON_BY_DOY[264:355] = 'Fall'
+_SEASON_BY_DOY[355:] = 'Winter'
+
+# Days back to the week's Sunday, indexed by datetime.date.weekday()
+_SUN_OFFSET = (1, 2, 3, 4, 5, 6, 0)
+
+# Column names of a date record, in output order
+_COLUMNS = ('date', 'date_key', 'day_name', 'day_name_abbrev', 'day_of_month', 'day_of_week',
+            'day_of_year', 'fiscal_month_number', 'fiscal_year', 'holiday_name', 'is_holiday',
+            'is_weekday', 'is_weekend', 'month_abbrev', 'month_end_flag', 'month_name',
+            'month_number', 'quarter', 'quarter_name', 'quarter_short_name',
+            'same_day_previous_year', 'same_day_previous_year_key', 'season', 'week_begin_date',
+            'week_begin_date_key', 'week_num_in_month', 'week_num_in_year', 'year',
+            'year_and_month', 'year_and_month_abbrev', 'year_and_quarter')
+
+# Columns written unquoted, matching csv.QUOTE_NONNUMERIC for int and bool values
+_NUMERIC_COLUMNS = frozenset(('date_key', 'day_of_month', 'day_of_week', 'day_of_year',
+                              'is_holiday', 'is_weekday', 'is_weekend', 'month_end_flag',
+                              'month_number', 'quarter', 'same_day_previous_year_key',
+                              'week_begin_date_key', 'week_num_in_month',
+                              'week_num_in_year', 'year'))
+
+# Columns which may hold None or text from outside this module
+_NULLABLE_COLUMNS = ('fiscal_month_number', 'fiscal_year', 'holiday_name')
+
+# Format of one CSV row, terminated like csv.writer's default dialect
+_ROW_FORMAT = ','.join('{}' if column in _NUMERIC_COLUMNS else '"{}"'
+                       for column in _COLUMNS) + '\r\n'
+
+# Number of rows formatted in memory before each write to the output file
+_CHUNK_SIZE = 4096
+
+# Fewest years handed to a worker process when writing in parallel
+_MIN_YEARS_PER_WORKER = 10
+
+def _chunked(iterable, size):
+    """
+    Yields successive lists of at most size items from iterable.
+    """
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+def _civil_from_days(days):
+    """
+    Converts an array of days since 1970-01-01 into arrays of year, month, and day
+    of month using integer arithmetic only. See Howard Hinnant's chrono-compatible
+    low-level date algorithms.
+    """
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524
+                   - day_of_era // 146096) // 365
+    # Day and month of a year starting on March 1st
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month_from_march = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month_from_march + 2) // 5 + 1
+    month = numpy.where(month_from_march < 10, month_from_march + 3, month_from_march - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+def _days_from_civil(year, month, day):
+    """
+    Converts year, month, and day of month arrays into an array of days since
+    1970-01-01. The inverse of _civil_from_days.
+    """
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * numpy.where(month > 2, month - 3, month + 9) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
 class DateDimensionBuilder(object):
     """
     Builds a date dimension, AKA a calendar dimension, for use in data warehousing.
@@ -26,34 +118,165 @@ class DateDimensionBuilder(object):
         """
         self.start_date = start_date
         self.end_date = end_date
+        self._us_holidays = holidays.UnitedStates(years=range(start_date.year, end_date.year+1))
 
     def date_records(self):
         """
         Returns a generator to iterate over each date record of the calendar.
         """
         for ordinal in range(self.start_date.toordinal(), self.end_date.toordinal()+1):
-            yield DateRecord(datetime.date.fromordinal(ordinal))
-
-    def write_to(self, file, columnsonly=False):
-        """
-        Write all date records to a csv file.
-        """
-        writer = csv.writer(file, delimiter=',', quoting=csv.QUOTE_NONNUMERIC, escapechar='\\')
-        writer.writerow(DateRecord.columns())
+            yield DateRecord(datetime.date.fromordinal(ordinal), self._us_holidays)
+
+    def date_columns(self):
+        """
+        Returns a dict mapping each column name in DateRecord.columns() to a list
+        holding that column's values for every date of the calendar. The columns
+        are computed with vectorized NumPy operations over the whole date range
+        rather than one DateRecord at a time.
+        """
+        days = numpy.arange(numpy.datetime64(self.start_date, 'D').astype(numpy.int64),
+                            numpy.datetime64(self.end_date, 'D').astype(numpy.int64) + 1)
+        if len(days) == 0:
+            return {name: [] for name in _COLUMNS}
+        dates = days.astype('datetime64[D]')
+        date_text = dates.astype(str)
+
+        year, month, day = _civil_from_days(days)
+        day_of_year = days - _days_from_civil(year, 1, 1) + 1
+        is_leap_year = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        days_in_month = numpy.array(_DAYS_IN_MONTH)[month] + ((month == 2) & is_leap_year)
+        # 1970-01-01 was a Thursday
+        weekday = (days + 3) % 7
+        day_of_week = (days + 4) % 7 + 1
+        quarter = (month + 2) // 3
+
+        # Sunday based weekday of the first of the month, as used by calendar.monthcalendar
+        first_of_month = (day_of_week - day) % 7
+        week_num_in_year = numpy.maximum((day_of_year + 7 - day_of_week) // 7, 1)
+        week_num_in_month = (day - 1 + first_of_month) // 7 + 1
+
+        week_begin = days - numpy.array(_SUN_OFFSET)[weekday]
+        week_begin_year, week_begin_month, week_begin_day = _civil_from_days(week_begin)
+        # Leap days fall back to February 28th of the previous year
+        previous_year_day = numpy.where((month == 2) & (day == 29), 28, day)
+        previous_year = _days_from_civil(year - 1, month, previous_year_day)
+
+        year_text = year.astype(str)
+        quarter_short_name = numpy.char.add('Q', quarter.astype(str))
+        month_abbrev = numpy.array(_MONTH_ABBR)[month]
+        holiday_name = [self._us_holidays.get(date) for date in dates.tolist()]
+
+        columns = {
+            'date': date_text,
+            'date_key': year * 10000 + month * 100 + day,
+            'day_name': numpy.array(_DAY_NAMES)[weekday],
+            'day_name_abbrev': numpy.array(_DAY_ABBR)[weekday],
+            'day_of_month': day,
+            'day_of_week': day_of_week,
+            'day_of_year': day_of_year,
+            'fiscal_month_number': [None] * len(dates),
+            'fiscal_year': [None] * len(dates),
+            'holiday_name': holiday_name,
+            'is_holiday': [name is not None for name in holiday_name],
+            'is_weekday': weekday < 5,
+            'is_weekend': weekday >= 5,
+            'month_abbrev': month_abbrev,
+            'month_end_flag': day == days_in_month,
+            'month_name': numpy.array(_MONTH_NAMES)[month],
+            'month_number': month,
+            'quarter': quarter,
+            'quarter_name': numpy.array(_QUARTER_NAMES)[quarter],
+            'quarter_short_name': quarter_short_name,
+            'same_day_previous_year': previous_year.astype('datetime64[D]').astype(str),
+            'same_day_previous_year_key': (year - 1) * 10000 + month * 100 + previous_year_day,
+            'season': _SEASON_BY_DOY[day_of_year],
+            'week_begin_date': week_begin.astype('datetime64[D]').astype(str),
+            'week_begin_date_key': (week_begin_year * 10000 + week_begin_month * 100
+                                    + week_begin_day),
+            'week_num_in_month': week_num_in_month,
+            'week_num_in_year': week_num_in_year,
+            'year': year,
+            'year_and_month': numpy.char.replace(date_text.astype('U7'), '-', '/'),
+            'year_and_month_abbrev': numpy.char.add(numpy.char.add(year_text, '/'), month_abbrev),
+            'year_and_quarter': numpy.char.add(numpy.char.add(year_text, '/'), quarter_short_name),
+        }
+        return {name: values.tolist() if isinstance(values, numpy.ndarray)
+                else values for name, values in columns.items()}
+
+    def csv_chunks(self):
+        """
+        Returns a generator of CSV formatted text, each holding up to
+        _CHUNK_SIZE rows of the calendar without the header.
+        """
+        columns = self.date_columns()
+        for name in _NULLABLE_COLUMNS:
+            columns[name] = ['' if value is None else str(value).replace('"', '""')
+                             for value in columns[name]]
+        rows = zip(*(columns[name] for name in _COLUMNS))
+        for chunk in _chunked(rows, _CHUNK_SIZE):
+            yield ''.join([_ROW_FORMAT.format(*row) for row in chunk])
+
+    def year_ranges(self, count):
+        """
+        Splits the calendar into at most count consecutive (start_date, end_date)
+        ranges on year boundaries.
+        """
+        years = self.end_date.year - self.start_date.year + 1
+        count = max(1, min(count, years))
+        ranges = []
+        for index in range(count):
+            first_year = self.start_date.year + years * index // count
+            last_year = self.start_date.year + years * (index + 1) // count - 1
+            ranges.append((self.start_date if index == 0 else datetime.date(first_year, 1, 1),
+                           self.end_date if index == count - 1
+                           else datetime.date(last_year, 12, 31)))
+        return ranges
+
+    def write_to(self, file, columnsonly=False, workers=None):
+        """
+        Write all date records to a csv file. Ranges of years are formatted in
+        parallel by up to workers processes, defaulting to the number of CPUs.
+        """
+        file.write(','.join('"' + column + '"' for column in _COLUMNS) + '\r\n')
         if columnsonly is False:
-            for date_record in self.date_records():
-                writer.writerow(date_record.to_list())
+            if workers is None:
+                workers = os.cpu_count() or 1
+            years = self.end_date.year - self.start_date.year + 1
+            ranges = self.year_ranges(min(workers, years // _MIN_YEARS_PER_WORKER))
+            if len(ranges) == 1:
+                for text in self.csv_chunks():
+                    file.write(text)
+            else:
+                with concurrent.futures.ProcessPoolExecutor(len(ranges)) as executor:
+                    for text in executor.map(_format_date_range, *zip(*ranges)):
+                        file.write(text)
+
+def _format_date_range(start_date, end_date):
+    """
+    Answers the CSV rows for start_date through end_date. Runs in a worker process.
+    """
+    return ''.join(DateDimensionBuilder(start_date, end_date).csv_chunks())
 
 class DateRecord(object):
     """
     Represents a date record in a date dimension.
     """
+    __slots__ = ('_current_date', '_y', '_m', '_d', '_doy', '_dow', '_first_dow_of_month',
+                 '_days_in_month', '_holidays_map')
 
-    def __init__(self, date):
+    def __init__(self, date, holidays_map=None):
         """
-        Construct a new date record for the given date.
+        Construct a new date record for the given date. Holidays are looked up in
+        holidays_map, which defaults to the standard US holidays.
         """
         self._current_date = date
+        self._y, self._m, self._d = date.year, date.month, date.day
+        self._doy = date.timetuple().tm_yday
+        self._dow = ((date.weekday() + 1) % 7) + 1
+        self._first_dow_of_month, self._days_in_month = calendar.monthrange(self._y, self._m)
+        if holidays_map is None:
+            holidays_map = holidays.UnitedStates()
+        self._holidays_map = holidays_map
 
     @property
     def date_key(self):
@@ -61,7 +284,7 @@ class DateRecord(object):
         Retruns an int representation of the date suitable
         for use as a primary key in a date dimension table
         """
-        return int(self._current_date.strftime("%Y%m%d"))
+        return self._y * 10000 + self._m * 100 + self._d
 
     @property
     def date(self):
@@ -79,16 +302,7 @@ class DateRecord(object):
         """
         Returns the season, i.e. Spring, Summer, Fall, or Winter.
         """
-        if self.day_of_year in range(80, 172):
-            season = 'Spring'
-        elif self.day_of_year in range(172, 264):
-            season = 'Summer'
-        elif self.day_of_year in range(264, 355):
-            season = 'Fall'
-        else:
-            season = 'Winter'
-
-        return season
+        return _SEASON_BY_DOY[self._doy].item()
 
     ###
     # Quarters
@@ -97,23 +311,21 @@ class DateRecord(object):
         """
         Returns the current quarter as an int, 1, 2, 3, or 4.
         """
-        return math.ceil(self._current_date.month/3)
+        return (self._m + 2) // 3
 
     @property
     def quarter_name(self):
         """
         Returns the quarter name, e.g. First, Second, Third, or Fourth
         """
-        quarters = {1: "First", 2: "Second", 3: "Third", 4: "Fourth"}
-        return quarters[self.quarter]
+        return _QUARTER_NAMES[(self._m + 2) // 3]
 
     @property
     def quarter_short_name(self):
         """
         Returns the short name of the quarter, i.e. Q1, Q2, Q3, or Q4
         """
-        quarters = {1: "Q1", 2: "Q2", 3: "Q3", 4: "Q4"}
-        return quarters[self.quarter]
+        return "Q" + str((self._m + 2) // 3)
 
     ###
     # Year Methods
@@ -122,7 +334,7 @@ class DateRecord(object):
         """
         Returns the year as an int.
         """
-        return int(self._current_date.strftime("%Y"))
+        return self._y
 
     @property
     def fiscal_year(self):
@@ -138,21 +350,21 @@ class DateRecord(object):
         """
         Returns the YYYY/Qn
         """
-        return str(self.year) + "/" + self.quarter_short_name
+        return str(self._y) + "/" + self.quarter_short_name
 
     @property
     def year_and_month(self):
         """
         Returns the year and month as YYYY/MM.
         """
-        return self._current_date.strftime("%Y/%m")
+        return "%04d/%02d" % (self._y, self._m)
 
     @property
     def year_and_month_abbrev(self):
         """
         Returns the year and month short name, e.g. YYYY/Oct.
         """
-        return str(self.year) + "/" + self.month_abbrev
+        return str(self._y) + "/" + self.month_abbrev
 
     ###
     # Month Methods
@@ -161,32 +373,28 @@ class DateRecord(object):
         """
         Returns an int representing the calendar month.
         """
-        return int(self._current_date.strftime("%m"))
+        return self._m
 
     @property
     def month_name(self):
         """
         Returns the long month name, e.g. January, December.
         """
-        return self._current_date.strftime("%B")
+        return _MONTH_NAMES[self._m]
 
     @property
     def month_abbrev(self):
         """
         Returns an abbreviated month name, e.g. Jan, Dec.
         """
-        return self._current_date.strftime("%b")
+        return _MONTH_ABBR[self._m]
 
     @property
     def month_end_flag(self):
         """
         Answers true if the day is the last day of the month.
         """
-        mrange = calendar.monthrange(self.year, self.month_number)
-        if mrange[1] == self.day_of_month:
-            return True
-        else:
-            return False
+        return self._d == self._days_in_month
 
     @property
     def fiscal_month_number(self):
@@ -204,7 +412,8 @@ class DateRecord(object):
         """
         Return the week's number in the calendar year.
         """
-        week = int(self._current_date.strftime("%U"))
+        # Same as strftime("%U"): days before the first Sunday fall in week 0
+        week = (self._doy + 7 - self._dow) // 7
         if week < 1:
             week = 1
         return week
@@ -214,30 +423,31 @@ class DateRecord(object):
         """
         Returns the week number in the month.
         """
-        mcalendar = calendar.monthcalendar(self._current_date.year, self._current_date.month)
-        matrix = numpy.array(mcalendar)
-        match = numpy.where(matrix == self.day_of_month)
-        week_of_month = match[0][0] + 1
-        return week_of_month
+        # monthrange answers a Monday based weekday for the first; weeks start on Sunday
+        return (self._d + ((self._first_dow_of_month + 1) % 7) - 1) // 7 + 1
 
     @property
     def week_begin_date_key(self):
         """
         Returns the Sunday of the week for the current date as an int for use as a key
         """
-        week_begin_date = datetime.datetime.strptime(self.week_begin_date, "%Y-%m-%d")
-        return week_begin_date.strftime("%Y%m%d")
+        week_begin = self._week_begin()
+        return week_begin.year * 10000 + week_begin.month * 100 + week_begin.day
 
     @property
     def week_begin_date(self):
         """
         Returns the Sunday of the week for the current date as a YYYY-MM-DD formatted string
         """
-        if self.day_name == 'Sunday':
-            return self.date
-        else:
-            return (self._current_date
-                    - datetime.timedelta(days=self.day_of_week)).strftime("%Y-%m-%d")
+        week_begin = self._week_begin()
+        return f"{week_begin.year:04d}-{week_begin.month:02d}-{week_begin.day:02d}"
+
+    def _week_begin(self):
+        """
+        Returns the Sunday of the week for the current date.
+        """
+        return self._current_date - datetime.timedelta(
+            days=_SUN_OFFSET[self._current_date.weekday()])
 
     ###
     # Day Methods
@@ -246,35 +456,35 @@ class DateRecord(object):
         """
         Returns the day of the year, 1..365.
         """
-        return self._current_date.timetuple().tm_yday
+        return self._doy
 
     @property
     def day_of_month(self):
         """
         Returns an int representing the day of the month.
         """
-        return int(self._current_date.strftime("%d"))
+        return self._d
 
     @property
     def day_of_week(self):
         """
         Returns the day's number, with 1 being Sunday and 7 being Saturday.
         """
-        return ((self._current_date.weekday() + 1) % 7) + 1
+        return self._dow
 
     @property
     def day_name(self):
         """
         Answers the day's name in long form, e.g. Monday
         """
-        return self._current_date.strftime("%A")
+        return _DAY_NAMES[self._current_date.weekday()]
 
     @property
     def day_name_abbrev(self):
         """
         Answers the day's name abbreveiated, e.g. Mon
         """
-        return self._current_date.strftime("%a")
+        return _DAY_ABBR[self._current_date.weekday()]
 
     @property
     def same_day_previous_year_key(self):
@@ -283,41 +493,44 @@ class DateRecord(object):
         If the present day is a leap day, the prior day of the previous year
         will be returned.
         """
-        return datetime.datetime.strptime(self.same_day_previous_year,
-                                          "%Y-%m-%d").strftime("%Y%m%d")
+        one_year_ago = self._one_year_ago()
+        return one_year_ago.year * 10000 + one_year_ago.month * 100 + one_year_ago.day
 
     @property
     def same_day_previous_year(self):
         """
         YYYY-MM-DD formatted version of same_day_previous_year_key
         """
-        year = self._current_date.year -1
-        month = self._current_date.month
-        day = self._current_date.day
+        return self._one_year_ago().strftime("%Y-%m-%d")
+
+    def _one_year_ago(self):
+        """
+        Returns this date one year ago, or the prior day if this is a leap day.
+        """
+        year = self._y - 1
+        month = self._m
+        day = self._d
         try:
             one_year_ago = datetime.date(year, month, day)
         except ValueError:
             # Error due to leap year. Use the date for the
             # previous year less a day.
             one_year_ago = datetime.date(year, month, day-1)
-        return one_year_ago.strftime("%Y-%m-%d")
+        return one_year_ago
 
     @property
     def is_weekday(self):
         """
         Answers True if not Saturday or Sunday.
         """
-        if self.day_name_abbrev == 'Sat' or self.day_name_abbrev == 'Sun':
-            return False
-        else:
-            return True
+        return 2 <= self._dow <= 6
 
     @property
     def is_weekend(self):
         """
         Answers True if Saturday or Sunday.
         """
-        return not self.is_weekday
+        return not 2 <= self._dow <= 6
 
     ###
     # Holidays
@@ -326,31 +539,36 @@ class DateRecord(object):
         """
         True if date is a standard US holiday.
         """
-        us_holidays = holidays.UnitedStates()
-        return self._current_date in us_holidays
+        return self._holiday_lookup()[0]
 
     @property
     def holiday_name(self):
         """
         Holiday name if there is one, None if not.
         """
-        us_holidays = holidays.UnitedStates()
-        return us_holidays.get(self._current_date.strftime("%Y-%m-%d"))
+        return self._holiday_lookup()[1]
+
+    def _holiday_lookup(self):
+        """
+        Returns is_holiday and holiday_name from a single lookup in the holidays map.
+        """
+        holiday_name = self._holidays_map.get(self._current_date)
+        return holiday_name is not None, holiday_name
 
     def to_list(self):
         """
         Returns a list representation of the record.
         """
-        return [getattr(self, value) for value in dir(self)
-                if value not in ("to_list", "columns") and value[0] is not "_"]
+        holiday = dict(zip(('is_holiday', 'holiday_name'), self._holiday_lookup()))
+        return [holiday[column] if column in holiday else getattr(self, column)
+                for column in _COLUMNS]
 
     @staticmethod
     def columns():
         """
         Returns the column names corresponding to to_list().
         """
-        return [value for value in dir(DateRecord)
-                if value not in ("to_list", "columns") and value[0] is not "_"]
+        return _COLUMNS
 
 def main():
     """
@@ -363,7 +581,7 @@ def main():
     parser.add_argument("-f",
                         "--file",
                         dest="filename",
-                        help="write output to a CSV file.",
+                        help="write output to a CSV file, gzip compressed if FILE ends in .gz.",
                         metavar="FILE")
     parser.add_argument("-s",
                         "--startdate",
@@ -395,7 +613,11 @@ def main():
         elif args.filename is None:
             builder.write_to(sys.stdout)
         else:
-            with open(args.filename, 'w', newline='') as dim_date_file:
+            if args.filename.endswith('.gz'):
+                dim_date_file = gzip.open(args.filename, 'wt', newline='', compresslevel=1)
+            else:
+                dim_date_file = open(args.filename, 'w', newline='')
+            with dim_date_file:
                 builder.write_to(dim_date_file)
             print("Date Dimension written to " + args.filename)
     except ValueError as err:
@@ -6,39 +6,87 @@ import sys
 import argparse
 import csv
 import datetime
+import gzip
+import io
+import numpy
+
+# Standard time window for each hour of the day
+_HOUR_CLASS = (('Night',) * 6 + ('Morning',) * 6 + ('Noon',) + ('Afternoon',) * 4
+               + ('Evening',) * 3 + ('Night',) * 4)
+
+# Rows buffered per write to the output file
+_CHUNK_SIZE = 4096
 
 class TimeDimensionBuilder(object):
     """
     Build a TimeDimension CSV file for use in a data warehouse/data mart.
     """
-    def __init__(self):
-        start = datetime.datetime(2018, 1, 1, 0, 0, 0)
-        self._times = [start + datetime.timedelta(seconds=x) for x in range(0, 86400)]
-
     def write_to(self, file):      
         """
         Write all time records to the csv file specified in the argument.
         """
-        writer = csv.writer(file, delimiter=',', quoting=csv.QUOTE_NONNUMERIC)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=',', quoting=csv.QUOTE_NONNUMERIC)
         writer.writerow(TimeRecord.columns())
-        for time_record in self.time_records():
-            writer.writerow(time_record.to_list())        
+        columns = self.time_columns()
+        rows = list(zip(*(columns[name] for name in TimeRecord.columns())))
+        for start in range(0, len(rows), _CHUNK_SIZE):
+            writer.writerows(rows[start:start + _CHUNK_SIZE])
+            file.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+
+    def time_columns(self):
+        """
+        Return a dict mapping each column name in TimeRecord.columns() to a list
+        of that column's values for every second of the day, computed with
+        vectorized NumPy operations.
+        """
+        seconds = numpy.arange(86400)
+        hour = seconds // 3600
+        minute = (seconds // 60) % 60
+        second = seconds % 60
+        civilian_hour = (hour - 1) % 12 + 1
+        am_pm = numpy.where(hour < 12, 'AM', 'PM')
+
+        minute_second = numpy.char.add(
+            numpy.char.add(':', numpy.char.zfill(minute.astype(str), 2)),
+            numpy.char.add(':', numpy.char.zfill(second.astype(str), 2)))
+        military_time = numpy.char.add(numpy.char.zfill(hour.astype(str), 2), minute_second)
+        civilian_time = numpy.char.add(
+            numpy.char.add(numpy.char.zfill(civilian_hour.astype(str), 2), minute_second),
+            numpy.char.add(' ', am_pm))
+        time_class = numpy.take(numpy.array(_HOUR_CLASS), hour)
+
+        columns = {
+            'time_key': hour * 10000 + minute * 100 + second,
+            'military_hour': hour,
+            'civilian_hour': civilian_hour,
+            'minute': minute,
+            'second': second,
+            'am_pm': am_pm,
+            'military_time': military_time,
+            'civilian_time': civilian_time,
+            'time_class': time_class,
+        }
+        return {name: values.tolist() for name, values in columns.items()}
 
     def time_records(self):
         """
         Return an iterator of TimeRecords
         """
-        for time in self._times:
-            yield TimeRecord(time)
+        start = datetime.datetime(2018, 1, 1, 0, 0, 0)
+        for second in range(0, 86400):
+            yield TimeRecord(start + datetime.timedelta(seconds=second))
 
 class TimeRecord(object):
     """
     Construct a record of a time dimension table representing a unique second.
     """
     def __init__(self, time):
-        self.time_key = int(datetime.datetime.strftime(time, '%H%M%S'))
-        self.military_hour = int(datetime.datetime.strftime(time, '%H'))
-        self.civilian_hour = int(datetime.datetime.strftime(time, '%I'))
+        self.time_key = time.hour * 10000 + time.minute * 100 + time.second
+        self.military_hour = time.hour
+        self.civilian_hour = (time.hour - 1) % 12 + 1
         self.minute = time.minute
         self.second = time.second
         self.am_pm = datetime.datetime.strftime(time, '%p')
@@ -51,20 +99,7 @@ class TimeRecord(object):
         Answer the standard time window, e.g. morning, noon, afternoon,
         evening, or night for the given hour
         """
-        if hour >= 0 and hour < 6:
-            result = "Night"
-        elif hour >= 6 and hour < 12:
-            result = "Morning"
-        elif hour >= 12 and hour < 13:
-            result = "Noon"
-        elif hour >= 13 and hour < 17:
-            result = "Afternoon"
-        elif hour >= 17 and hour < 20:
-            result = "Evening"
-        elif hour >= 20 and hour <= 24:
-            result = "Night"
-
-        return result
+        return _HOUR_CLASS[hour]
 
     def to_list(self):
         """
@@ -99,7 +134,7 @@ def main():
     parser.add_argument("-f",
                         "--file",
                         dest="filename",
-                        help="write output to a CSV file",
+                        help="write output to a CSV file, gzip compressed if FILE ends in .gz",
                         metavar="FILE")
     args = parser.parse_args()
 
@@ -107,7 +142,11 @@ def main():
     if args.filename is None:
         builder.write_to(sys.stdout)
     else:
-        with open(args.filename, 'w', newline='') as dim_time_file:
+        if args.filename.endswith('.gz'):
+            dim_time_file = gzip.open(args.filename, 'wt', newline='', compresslevel=1)
+        else:
+            dim_time_file = open(args.filename, 'w', newline='')
+        with dim_time_file:
             builder.write_to(dim_time_file)
         print("Time Dimension written to " + args.filename)
 